@@ -4,15 +4,18 @@ import uuid
 import logging
 import threading
 import time
-from datetime import datetime, timedelta
-from flask import Flask, request, jsonify, send_from_directory, url_for
-from flask_cors import CORS
+import subprocess
+import queue
+import glob
+import shutil
 import tempfile
-from moviepy.editor import VideoFileClip, concatenate_videoclips
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import Flask, Response, request, jsonify, send_from_directory, url_for
+from flask_cors import CORS
 import yt_dlp
 from flasgger import Swagger, swag_from
-import json
-import fcntl
+import sqlite3
 from pathlib import Path
 
 # Configure logging
@@ -28,6 +31,14 @@ CORS(app)
 
 # Configure Flask
 app.config['PREFERRED_URL_SCHEME'] = SCHEME
+# Responses are small dicts; skip sorting their keys on every jsonify
+app.config['JSON_SORT_KEYS'] = False
+
+# Let a reverse proxy serve video files. X_ACCEL_REDIRECT_PREFIX is the nginx
+# internal location mapped to VIDEO_DIR (e.g. /_videos/); USE_X_SENDFILE enables
+# the X-Sendfile header for Apache/lighttpd instead.
+X_ACCEL_REDIRECT_PREFIX = os.environ.get('X_ACCEL_REDIRECT_PREFIX')
+app.use_x_sendfile = os.environ.get('USE_X_SENDFILE', '').lower() in ('1', 'true', 'yes')
 
 # Directory to store processed videos
 VIDEO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "videos")
@@ -109,101 +120,215 @@ swagger_template = {
 
 swagger = Swagger(app, config=swagger_config, template=swagger_template)
 
-# Jobs storage
-JOBS_FILE = os.path.join(os.path.dirname(__file__), 'jobs.json')
+# yt-dlp reports failures by raising; its progress and log chatter is dropped
+# before any formatting happens
+YDL_LOGGER = logging.getLogger('ytdlp_null')
+YDL_LOGGER.setLevel(logging.CRITICAL + 1)
+YDL_LOGGER.propagate = False
+
+# Download settings shared by every yt-dlp job. yt-dlp falls back to its
+# native downloader (with concurrent fragments) when aria2c is not installed.
+YDL_DOWNLOAD_OPTS = {
+    'external_downloader': {'default': 'aria2c'},
+    'external_downloader_args': {'aria2c': ['-x', '16', '-s', '16', '-k', '1M']},
+    'concurrent_fragment_downloads': 8,
+    # Large request chunks and read buffers for the native downloader
+    'http_chunk_size': 10 * 1024 * 1024,
+    'buffersize': 1024 * 1024,
+    'noprogress': True,
+    'logger': YDL_LOGGER,
+    # Keep the local write time as mtime; cleanup_old_videos expires by it
+    'updatetime': False,
+}
+
+# Cookies for YouTube are opt-in: COOKIES_FILE is a plain Netscape cookie file
+# (each job gets its own copy, see job_cookiefile), while USE_BROWSER_COOKIES
+# reads Chrome's profile on every job
+COOKIES_FILE = os.environ.get('COOKIES_FILE')
+if not COOKIES_FILE and os.environ.get('USE_BROWSER_COOKIES', '').lower() in ('1', 'true', 'yes'):
+    YDL_DOWNLOAD_OPTS['cookiesfrombrowser'] = ('chrome',)
+
+# yt-dlp errors meaning a time range cannot be fetched for this video; any
+# other DownloadError is a real failure and must not trigger a full download
+RANGE_UNSUPPORTED_ERRORS = (
+    'cannot be partially downloaded',
+    'ffmpeg is not installed',
+)
 
-def timestamp_to_seconds(timestamp):
-    """Convert timestamp string (HH:MM:SS.mmm) to seconds."""
-    h, m, s = timestamp.split(':')
-    seconds = float(s) + int(m) * 60 + int(h) * 3600
-    return seconds
+def make_job_executor(max_workers):
+    """Return a job pool whose workers are real OS threads.
 
-def save_jobs():
-    """Save jobs to persistent storage with proper locking."""
+    Under gunicorn's gevent worker, threading is monkey-patched and a plain
+    ThreadPoolExecutor would run jobs as greenlets on the event loop, where
+    yt-dlp's CPU-bound extraction and sqlite waits would stall every request.
+    gevent's own executor keeps the same API but uses native threads.
+    """
     try:
-        temp_file = f"{JOBS_FILE}.tmp"
-        with open(temp_file, 'w') as f:
-            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
-            try:
-                json.dump(jobs, f, indent=2)
-                f.flush()
-                os.fsync(f.fileno())
-            finally:
-                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-        
-        os.chmod(temp_file, 0o666)
-        os.replace(temp_file, JOBS_FILE)
-        os.chmod(JOBS_FILE, 0o666)
-        return True
-    except Exception as e:
-        logger.error(f"Error saving jobs: {str(e)}")
-        return False
+        from gevent import monkey
+        if monkey.is_module_patched('threading'):
+            from gevent.threadpool import ThreadPoolExecutor as NativeThreadPoolExecutor
+            return NativeThreadPoolExecutor(max_workers=max_workers)
+    except ImportError:
+        pass
+    return ThreadPoolExecutor(max_workers=max_workers)
+
+# Background jobs run on a bounded pool; extra requests wait in its queue
+JOB_EXECUTOR = make_job_executor(int(os.environ.get('MAX_CONCURRENT_JOBS', '4')))
+
+# Limit how many ffmpeg clip cuts run at once in this worker. Downloads are not
+# gated here: they are network-bound and must not queue behind each other. By
+# default the cores are split across the gunicorn workers (WEB_CONCURRENCY) so
+# the host as a whole is not oversubscribed.
+ENCODE_SEM = threading.BoundedSemaphore(int(os.environ.get(
+    'MAX_CONCURRENT_ENCODES',
+    max(1, (os.cpu_count() or 1) // int(os.environ.get('WEB_CONCURRENCY', '1')))
+)))
+
+# YouTube video URLs accepted by the API; anything else is rejected before
+# a job is queued
+YT_URL_RE = re.compile(
+    r'^https?://(www\.|m\.|music\.)?(youtube\.com/(watch\?v=|shorts/)|youtu\.be/)[\w\-]{6,}',
+    re.I
+)
+
+# Timestamp format accepted by the API (HH:MM:SS.mmm)
+TIMESTAMP_RE = re.compile(r'^(\d{2}):(\d{2}):(\d{2}\.\d{3})$')
+
+# Jobs storage
+JOBS_DB = os.path.join(os.path.dirname(__file__), 'jobs.db')
+# Serializes writes on the shared jobs_db connection
+jobs_db_lock = threading.Lock()
+# Idle read-only connections reused by get_job
+jobs_db_readers = queue.SimpleQueue()
 
-def load_jobs():
-    """Load jobs from persistent storage."""
-    global jobs
+# Videos are deleted this many seconds after they were written
+VIDEO_TTL = 24 * 3600
+# Seconds between background sweeps for expired videos
+CLEANUP_INTERVAL = int(os.environ.get('CLEANUP_INTERVAL', '3600'))
+
+def timestamp_to_seconds(match):
+    """Convert a TIMESTAMP_RE match (HH:MM:SS.mmm) to seconds."""
+    return 3600 * int(match[1]) + 60 * int(match[2]) + float(match[3])
+
+def connect_jobs_db(read_only=False):
+    """Connect to the jobs database; read_only connections refuse writes."""
+    conn = sqlite3.connect(JOBS_DB, check_same_thread=False, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA busy_timeout=5000')
+    if read_only:
+        conn.execute('PRAGMA query_only=ON')
+    return conn
+
+def open_jobs_db():
+    """Open the jobs database in WAL mode and make sure the jobs table exists."""
+    conn = connect_jobs_db()
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            status TEXT,
+            message TEXT,
+            created_at TEXT,
+            download_url TEXT,
+            output_file TEXT,
+            error TEXT
+        )
+    """)
+    return conn
+
+def get_job(job_id):
+    """Return a job as a dict, or None if it does not exist."""
+    # WAL readers never block the writer, so reads skip jobs_db_lock and use
+    # a pooled connection of their own
     try:
-        if not os.path.exists(JOBS_FILE):
-            jobs = {}
-            save_jobs()
-            return jobs
-            
-        with open(JOBS_FILE, 'r') as f:
-            fcntl.flock(f.fileno(), fcntl.LOCK_SH)
-            try:
-                jobs = json.loads(f.read().strip() or '{}')
-            finally:
-                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-        return jobs
-    except Exception as e:
-        logger.error(f"Error loading jobs: {str(e)}")
-        jobs = {}
-        return jobs
+        conn = jobs_db_readers.get_nowait()
+    except queue.Empty:
+        conn = connect_jobs_db(read_only=True)
+    try:
+        row = conn.execute(
+            'SELECT status, message, created_at, download_url, output_file, error '
+            'FROM jobs WHERE id = ?',
+            (job_id,)
+        ).fetchone()
+    finally:
+        jobs_db_readers.put(conn)
+    if row is None:
+        return None
+    return {key: row[key] for key in row.keys() if row[key] is not None}
 
 def cleanup_old_videos():
     """Clean up videos older than 24 hours."""
     try:
-        current_time = datetime.now()
-        for job_id, job in jobs.items():
-            if job.get('created_at'):
-                created_time = datetime.fromisoformat(job['created_at'])
-                if (current_time - created_time) > timedelta(hours=24):
-                    # Delete the video file
-                    output_file = job.get('output_file')
-                    if output_file and os.path.exists(os.path.join(VIDEO_DIR, output_file)):
-                        os.remove(os.path.join(VIDEO_DIR, output_file))
-                    # Update job status
-                    job['status'] = 'expired'
-                    job['message'] = 'Video deleted after 24 hours'
-                    save_jobs()
+        cutoff = time.time() - VIDEO_TTL
+        expired_files = []
+        for entry in os.scandir(VIDEO_DIR):
+            try:
+                if not entry.is_file() or entry.stat().st_mtime >= cutoff:
+                    continue
+                os.unlink(entry.path)
+            except FileNotFoundError:
+                # Another worker's sweep got here first; the job still needs marking
+                pass
+            expired_files.append((entry.name,))
+        if not expired_files:
+            return
+        # Mark the owning jobs in one transaction
+        with jobs_db_lock:
+            jobs_db.execute('BEGIN')
+            try:
+                jobs_db.executemany(
+                    "UPDATE jobs SET status = 'expired', message = 'Video deleted after 24 hours' "
+                    "WHERE output_file = ?",
+                    expired_files
+                )
+                jobs_db.execute('COMMIT')
+            except Exception:
+                jobs_db.execute('ROLLBACK')
+                raise
     except Exception as e:
         logger.error(f"Error cleaning up old videos: {str(e)}")
 
-def update_job_status(job_id, status, message=None, download_url=None, output_file=None):
+def compact_jobs_db():
+    """Fold the WAL back into the jobs database and truncate it."""
+    try:
+        with jobs_db_lock:
+            jobs_db.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    except Exception as e:
+        logger.error(f"Error compacting jobs database: {str(e)}")
+
+def cleanup_loop():
+    """Run cleanup_old_videos and compact the jobs log every CLEANUP_INTERVAL seconds."""
+    while True:
+        cleanup_old_videos()
+        compact_jobs_db()
+        time.sleep(CLEANUP_INTERVAL)
+
+def update_job_status(job_id, status, message=None, download_url=None, output_file=None, error=None):
     """Update job status with proper error handling."""
     try:
-        if job_id not in jobs:
-            jobs[job_id] = {
-                'status': status,
-                'message': message or '',
-                'created_at': datetime.now().isoformat()
-            }
-        else:
-            jobs[job_id]['status'] = status
-            if message is not None:
-                jobs[job_id]['message'] = message
-                
-        if download_url is not None:
-            jobs[job_id]['download_url'] = download_url
-        if output_file is not None:
-            jobs[job_id]['output_file'] = output_file
-            
-        save_jobs()
+        with jobs_db_lock:
+            jobs_db.execute(
+                """
+                INSERT INTO jobs (id, status, message, created_at, download_url, output_file, error)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    status = excluded.status,
+                    message = COALESCE(excluded.message, message),
+                    download_url = COALESCE(excluded.download_url, download_url),
+                    output_file = COALESCE(excluded.output_file, output_file),
+                    error = COALESCE(excluded.error, error)
+                """,
+                (job_id, status, message, datetime.now().isoformat(),
+                 download_url, output_file, error)
+            )
         return True
     except Exception as e:
         logger.error(f"Error updating job status: {str(e)}")
         return False
 
+jobs_db = open_jobs_db()
+
 def get_download_url(filename):
     """Generate download URL without requiring request context."""
     return f"{SCHEME}://{DOMAIN}/download/{filename}"
@@ -212,16 +337,49 @@ def get_status_url(job_id):
     """Generate status URL without requiring request context."""
     return f"{SCHEME}://{DOMAIN}/job/{job_id}"
 
-def process_video_task(job_id, youtube_url, start_time, end_time):
-    jobs = load_jobs()
+def cut_clip(input_path, output_path, start_seconds, end_seconds):
+    """Cut [start, end] out of input_path into output_path without re-encoding."""
+    with ENCODE_SEM:
+        subprocess.run(
+            ['ffmpeg', '-y', '-v', 'error',
+             '-ss', str(start_seconds), '-i', input_path,
+             '-t', str(end_seconds - start_seconds), '-c', 'copy', '-flush_packets', '0', '-movflags', '+faststart', output_path],
+            check=True, capture_output=True, stdin=subprocess.DEVNULL
+        )
+
+def job_cookiefile(job_id):
+    """Copy COOKIES_FILE for one job and return the copy's path, or None.
+
+    yt-dlp writes the cookie jar back to its cookiefile when a YoutubeDL
+    closes, so concurrent jobs sharing COOKIES_FILE would clobber it.
+    """
+    if not COOKIES_FILE:
+        return None
+    path = os.path.join(tempfile.gettempdir(), f"{job_id}.cookies.txt")
+    shutil.copyfile(COOKIES_FILE, path)
+    return path
+
+def remove_job_cookiefile(path):
+    """Delete a copy made by job_cookiefile."""
+    if path and os.path.exists(path):
+        os.unlink(path)
+
+def submit_job(task, *args):
+    """Run a job task in the background, off the request thread."""
+    JOB_EXECUTOR.submit(task, *args)
+
+def process_video_task(job_id, youtube_url, start_seconds, end_seconds):
+    input_path = os.path.join(VIDEO_DIR, f"{job_id}_src.mp4")
     output_path = os.path.join(VIDEO_DIR, f"{job_id}.mp4")
+    cookiefile = None
     
     try:
+        cookiefile = job_cookiefile(job_id)
         # Configure yt-dlp with better options
         ydl_opts = {
             'format': 'bv*[ext=mp4]+ba[ext=m4a]/b[ext=mp4] / bv*+ba/b',  # More reliable format selection
             'merge_output_format': 'mp4',
-            'outtmpl': os.path.join(VIDEO_DIR, f"temp_{job_id}.%(ext)s"),
+            'outtmpl': output_path,
             'quiet': True,
             'no_warnings': True,
             'extract_flat': False,
@@ -234,6 +392,16 @@ def process_video_task(job_id, youtube_url, start_time, end_time):
             'skip_unavailable_fragments': True,
             'geo_bypass': True,
             'geo_bypass_country': 'US',
+            # Fetch just the clip instead of the whole video
+            'download_ranges': yt_dlp.utils.download_range_func(None, [(start_seconds, end_seconds)]),
+            **YDL_DOWNLOAD_OPTS,
+            'cookiefile': cookiefile,
+            # Range downloads are fetched and merged by ffmpeg itself (no Merger
+            # postprocessor), so faststart has to be passed to that ffmpeg run
+            'external_downloader_args': {
+                **YDL_DOWNLOAD_OPTS['external_downloader_args'],
+                'ffmpeg_o': ['-movflags', '+faststart'],
+            },
         }
         
         logger.info(f"Starting download for job {job_id}")
@@ -246,60 +414,61 @@ def process_video_task(job_id, youtube_url, start_time, end_time):
                 logger.error(f"Failed to extract video info: {str(e)}")
                 raise
 
-            # Download the video
-            ydl.download([youtube_url])
+            # Validate timestamps against the reported duration before downloading
+            duration = video_info.get('duration')
+            if duration:
+                if start_seconds >= duration:
+                    raise ValueError(f"Start timestamp is beyond video duration ({duration}s)")
+                end_seconds = min(end_seconds, duration)
+
+            # Download only the requested range, reusing the extracted info
+            try:
+                ydl.process_ie_result(video_info, download=True)
+                clipped = True
+            except yt_dlp.utils.DownloadError as e:
+                if not any(reason in str(e) for reason in RANGE_UNSUPPORTED_ERRORS):
+                    raise
+                logger.warning(f"Range download unsupported for job {job_id}, downloading full video: {str(e)}")
+                # Drop partial outputs ({job_id}.mp4, .part and per-format files)
+                for leftover in glob.glob(os.path.join(VIDEO_DIR, f"{job_id}.*")):
+                    os.unlink(leftover)
+                clipped = False
+
+        if not clipped:
+            # Fetch the full video to the source path, not the advertised clip
+            # path, then stream-copy the clip into place
+            fallback_opts = {**ydl_opts, 'outtmpl': input_path}
+            del fallback_opts['download_ranges']
+            with yt_dlp.YoutubeDL(fallback_opts) as ydl:
+                ydl.process_ie_result(video_info, download=True)
+            if not os.path.exists(input_path):
+                raise Exception("Downloaded video file not found")
+            cut_clip(input_path, output_path, start_seconds, end_seconds)
             
-        input_path = os.path.join(VIDEO_DIR, f"temp_{job_id}.mp4")
-        if not os.path.exists(input_path):
+        if not os.path.exists(output_path):
             raise Exception("Downloaded video file not found")
 
-        logger.info(f"Video downloaded successfully, processing clip for job {job_id}")
-        
-        # Process video with moviepy
-        with VideoFileClip(input_path) as video:
-            # Convert timestamps to seconds
-            start_seconds = sum(x * float(t) for x, t in zip([3600, 60, 1], start_time.split(":")))
-            end_seconds = sum(x * float(t) for x, t in zip([3600, 60, 1], end_time.split(":")))
-            
-            # Validate timestamps against video duration
-            if end_seconds > video.duration:
-                end_seconds = video.duration
-            if start_seconds >= video.duration:
-                raise ValueError("Start timestamp is beyond video duration")
-
-            # Cut video
-            new_video = video.subclip(start_seconds, end_seconds)
-            new_video.write_videofile(
-                output_path,
-                codec='libx264',
-                audio_codec='aac',
-                temp_audiofile=os.path.join(VIDEO_DIR, f'temp_{job_id}.m4a'),
-                remove_temp=True,
-                logger=None  # Disable moviepy logging
-            )
-        
-        # Clean up temporary files
-        if os.path.exists(input_path):
-            os.remove(input_path)
+        logger.info(f"Video downloaded successfully for job {job_id}")
         
         # Update job status
-        jobs[job_id].update({
-            'status': 'completed',
-            'download_url': get_download_url(f"{job_id}.mp4"),
-            'message': 'Video processed successfully'
-        })
+        status = 'completed'
+        update_job_status(
+            job_id, status, 'Video processed successfully',
+            download_url=get_download_url(f"{job_id}.mp4"),
+            output_file=f"{job_id}.mp4"
+        )
         
     except Exception as e:
         logger.error(f"Error processing job {job_id}: {str(e)}")
-        jobs[job_id].update({
-            'status': 'failed',
-            'error': str(e),
-            'message': 'Failed to process video'
-        })
+        status = 'failed'
+        update_job_status(job_id, status, 'Failed to process video', error=str(e))
     
     finally:
-        save_jobs()
-        logger.info(f"Job {job_id} processing completed with status: {jobs[job_id]['status']}")
+        # Clean up the full-length source left by the fallback path
+        if os.path.exists(input_path):
+            os.unlink(input_path)
+        remove_job_cookiefile(cookiefile)
+        logger.info(f"Job {job_id} processing completed with status: {status}")
 
 @app.route('/process_video', methods=['POST'])
 @swag_from({
@@ -330,8 +499,8 @@ def process_video_task(job_id, youtube_url, start_time, end_time):
         }
     ],
     'responses': {
-        '200': {
-            'description': 'Job created successfully',
+        '202': {
+            'description': 'Job accepted; poll the URL in the Location header',
             'schema': {'$ref': '#/definitions/JobResponse'}
         },
         '400': {
@@ -368,8 +537,8 @@ def process_video():
         description: End timestamp (HH:MM:SS.mmm)
         default: 00:00:20.000
     responses:
-      200:
-        description: Job created successfully
+      202:
+        description: Job accepted; poll the URL in the Location header
         schema:
           type: object
           properties:
@@ -388,34 +557,43 @@ def process_video():
     try:
         # Use default test video URL if not provided
         youtube_url = request.form.get('youtube_url', TEST_VIDEO['url'])
+        if not YT_URL_RE.match(youtube_url):
+            raise ValueError("youtube_url must be a YouTube video URL")
         
         # Use default timestamps if not provided
         input_timestamp = request.form.get('input_timestamp', TEST_VIDEO['start_timestamp'])
         output_timestamp = request.form.get('output_timestamp', TEST_VIDEO['end_timestamp'])
         
+        # Validate and parse timestamps in one pass, before queuing any work
+        input_match = TIMESTAMP_RE.match(input_timestamp)
+        output_match = TIMESTAMP_RE.match(output_timestamp)
+        if input_match is None or output_match is None:
+            raise ValueError("Timestamps must be in format HH:MM:SS.mmm")
+        start_seconds = timestamp_to_seconds(input_match)
+        end_seconds = timestamp_to_seconds(output_match)
+        if end_seconds <= start_seconds:
+            raise ValueError("output_timestamp must be after input_timestamp")
+        
         # Generate a unique job ID
         job_id = str(uuid.uuid4())
         
         # Initialize job
         update_job_status(job_id, 'queued', 'Job created successfully')
         
-        # Start processing in a separate thread
-        threading.Thread(
-            target=process_video_task,
-            args=(job_id, youtube_url, input_timestamp, output_timestamp),
-            daemon=True
-        ).start()
+        # Queue processing on the job pool
+        submit_job(process_video_task, job_id, youtube_url, start_seconds, end_seconds)
         
         # Prepare response with direct download URL
+        status_url = get_status_url(job_id)
         download_url = get_download_url(f"{job_id}.mp4")
         
         return jsonify({
             'job_id': job_id,
             'status': 'queued',
             'message': 'Job created successfully',
-            'check_status_url': get_status_url(job_id),
+            'check_status_url': status_url,
             'download_url': download_url
-        }), 200
+        }), 202, {'Location': status_url, 'Cache-Control': 'no-store'}
         
     except Exception as e:
         app.logger.error('Error processing request: %s', str(e))
@@ -449,17 +627,34 @@ def process_video():
     }
 })
 def get_job_status(job_id):
-    cleanup_old_videos()  # Clean up old videos when checking status
-    job = jobs.get(job_id)
+    job = get_job(job_id)
     if job is None:
         return jsonify({'error': 'Job not found'}), 404
-    return jsonify(job)
+    response = jsonify(job)
+    # Let proxies coalesce rapid polls; finished jobs no longer change
+    if job['status'] in ('completed', 'failed', 'expired'):
+        response.headers['Cache-Control'] = 'public, max-age=3600, immutable'
+    else:
+        response.headers['Cache-Control'] = 'public, max-age=2'
+    return response
 
 @app.route('/download/<filename>')
 def download_file(filename):
-    cleanup_old_videos()  # Clean up old videos before download
+    if X_ACCEL_REDIRECT_PREFIX:
+        if os.path.basename(filename) != filename or not os.path.isfile(os.path.join(VIDEO_DIR, filename)):
+            return 'File not found', 404
+        # Hand the transfer to nginx; the worker returns immediately
+        response = Response()
+        response.headers['X-Accel-Redirect'] = f"{X_ACCEL_REDIRECT_PREFIX.rstrip('/')}/{filename}"
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
     try:
-        return send_from_directory(VIDEO_DIR, filename, as_attachment=True)
+        # Conditional responses honour Range/If-None-Match so clients can resume
+        response = send_from_directory(
+            VIDEO_DIR, filename, as_attachment=True, conditional=True, max_age=3600
+        )
+        response.headers['Accept-Ranges'] = 'bytes'
+        return response
     except Exception as e:
         return str(e), 404
 
@@ -486,10 +681,11 @@ TEST_TIMESTAMPS = [
 
 # New function for downloading 1080p videos
 def download_1080p_task(job_id, youtube_url):
-    jobs = load_jobs()
     output_path = os.path.join(VIDEO_DIR, f"{job_id}_1080p.mp4")
+    cookiefile = None
     
     try:
+        cookiefile = job_cookiefile(job_id)
         # Configure yt-dlp with options for 1080p
         ydl_opts = {
             'format': 'bv*[height<=1080][ext=mp4]+ba[ext=m4a]/b[height<=1080][ext=mp4] / bv*[height<=1080]+ba/b[height<=1080]',
@@ -503,6 +699,8 @@ def download_1080p_task(job_id, youtube_url):
             'skip_unavailable_fragments': True,
             'geo_bypass': True,
             'geo_bypass_country': 'US',
+            **YDL_DOWNLOAD_OPTS,
+            'cookiefile': cookiefile,
         }
         
         logger.info(f"Starting 1080p download for job {job_id}")
@@ -515,34 +713,33 @@ def download_1080p_task(job_id, youtube_url):
                 logger.error(f"Failed to extract video info: {str(e)}")
                 raise
             
-            # Download the video
-            ydl.download([youtube_url])
+            # Download the video, reusing the extracted info
+            ydl.process_ie_result(video_info, download=True)
         
         # Update job status
-        jobs[job_id].update({
-            'status': 'completed',
-            'download_url': get_download_url(f"{job_id}_1080p.mp4"),
-            'message': '1080p video downloaded successfully'
-        })
+        status = 'completed'
+        update_job_status(
+            job_id, status, '1080p video downloaded successfully',
+            download_url=get_download_url(f"{job_id}_1080p.mp4"),
+            output_file=f"{job_id}_1080p.mp4"
+        )
         
     except Exception as e:
         logger.error(f"Error processing 1080p download job {job_id}: {str(e)}")
-        jobs[job_id].update({
-            'status': 'failed',
-            'error': str(e),
-            'message': 'Failed to download 1080p video'
-        })
+        status = 'failed'
+        update_job_status(job_id, status, 'Failed to download 1080p video', error=str(e))
     
     finally:
-        save_jobs()
-        logger.info(f"1080p download job {job_id} completed with status: {jobs[job_id]['status']}")
+        remove_job_cookiefile(cookiefile)
+        logger.info(f"1080p download job {job_id} completed with status: {status}")
 
 # New function for downloading MP3 audio
 def download_mp3_task(job_id, youtube_url):
-    jobs = load_jobs()
     output_path = os.path.join(VIDEO_DIR, f"{job_id}.mp3")
+    cookiefile = None
     
     try:
+        cookiefile = job_cookiefile(job_id)
         # Configure yt-dlp with options for MP3
         ydl_opts = {
             'format': 'bestaudio/best',
@@ -560,6 +757,8 @@ def download_mp3_task(job_id, youtube_url):
             'skip_unavailable_fragments': True,
             'geo_bypass': True,
             'geo_bypass_country': 'US',
+            **YDL_DOWNLOAD_OPTS,
+            'cookiefile': cookiefile,
         }
         
         logger.info(f"Starting MP3 download for job {job_id}")
@@ -572,27 +771,25 @@ def download_mp3_task(job_id, youtube_url):
                 logger.error(f"Failed to extract video info: {str(e)}")
                 raise
             
-            # Download the audio
-            ydl.download([youtube_url])
+            # Download the audio, reusing the extracted info
+            ydl.process_ie_result(video_info, download=True)
         
         # Update job status
-        jobs[job_id].update({
-            'status': 'completed',
-            'download_url': get_download_url(f"{job_id}.mp3"),
-            'message': 'MP3 audio downloaded successfully'
-        })
+        status = 'completed'
+        update_job_status(
+            job_id, status, 'MP3 audio downloaded successfully',
+            download_url=get_download_url(f"{job_id}.mp3"),
+            output_file=f"{job_id}.mp3"
+        )
         
     except Exception as e:
         logger.error(f"Error processing MP3 download job {job_id}: {str(e)}")
-        jobs[job_id].update({
-            'status': 'failed',
-            'error': str(e),
-            'message': 'Failed to download MP3 audio'
-        })
+        status = 'failed'
+        update_job_status(job_id, status, 'Failed to download MP3 audio', error=str(e))
     
     finally:
-        save_jobs()
-        logger.info(f"MP3 download job {job_id} completed with status: {jobs[job_id]['status']}")
+        remove_job_cookiefile(cookiefile)
+        logger.info(f"MP3 download job {job_id} completed with status: {status}")
 
 @app.route('/download_1080p', methods=['POST'])
 @swag_from({
@@ -609,8 +806,8 @@ def download_mp3_task(job_id, youtube_url):
         }
     ],
     'responses': {
-        '200': {
-            'description': 'Job created successfully',
+        '202': {
+            'description': 'Job accepted; poll the URL in the Location header',
             'schema': {'$ref': '#/definitions/JobResponse'}
         },
         '400': {
@@ -635,8 +832,8 @@ def download_1080p():
         description: YouTube video URL (defaults to test video if not provided)
         default: https://www.youtube.com/watch?v=sEFARrqZ9y8
     responses:
-      200:
-        description: Job created successfully
+      202:
+        description: Job accepted; poll the URL in the Location header
         schema:
           type: object
           properties:
@@ -654,6 +851,8 @@ def download_1080p():
     app.logger.info('Received 1080p download request: %s', request.form)
     try:
         youtube_url = request.form.get('youtube_url', TEST_VIDEO['url'])
+        if not YT_URL_RE.match(youtube_url):
+            raise ValueError("youtube_url must be a YouTube video URL")
         
         # Generate a unique job ID
         job_id = str(uuid.uuid4())
@@ -661,23 +860,20 @@ def download_1080p():
         # Initialize job
         update_job_status(job_id, 'queued', 'Job created successfully')
         
-        # Start processing in a separate thread
-        threading.Thread(
-            target=download_1080p_task,
-            args=(job_id, youtube_url),
-            daemon=True
-        ).start()
+        # Queue processing on the job pool
+        submit_job(download_1080p_task, job_id, youtube_url)
         
         # Prepare response with direct download URL
+        status_url = get_status_url(job_id)
         download_url = get_download_url(f"{job_id}_1080p.mp4")
         
         return jsonify({
             'job_id': job_id,
             'status': 'queued',
             'message': 'Job created successfully',
-            'check_status_url': get_status_url(job_id),
+            'check_status_url': status_url,
             'download_url': download_url
-        }), 200
+        }), 202, {'Location': status_url, 'Cache-Control': 'no-store'}
         
     except Exception as e:
         app.logger.error('Error processing 1080p download request: %s', str(e))
@@ -701,8 +897,8 @@ def download_1080p():
         }
     ],
     'responses': {
-        '200': {
-            'description': 'Job created successfully',
+        '202': {
+            'description': 'Job accepted; poll the URL in the Location header',
             'schema': {'$ref': '#/definitions/JobResponse'}
         },
         '400': {
@@ -727,8 +923,8 @@ def download_mp3():
         description: YouTube video URL (defaults to test video if not provided)
         default: https://www.youtube.com/watch?v=sEFARrqZ9y8
     responses:
-      200:
-        description: Job created successfully
+      202:
+        description: Job accepted; poll the URL in the Location header
         schema:
           type: object
           properties:
@@ -746,6 +942,8 @@ def download_mp3():
     app.logger.info('Received MP3 download request: %s', request.form)
     try:
         youtube_url = request.form.get('youtube_url', TEST_VIDEO['url'])
+        if not YT_URL_RE.match(youtube_url):
+            raise ValueError("youtube_url must be a YouTube video URL")
         
         # Generate a unique job ID
         job_id = str(uuid.uuid4())
@@ -753,23 +951,20 @@ def download_mp3():
         # Initialize job
         update_job_status(job_id, 'queued', 'Job created successfully')
         
-        # Start processing in a separate thread
-        threading.Thread(
-            target=download_mp3_task,
-            args=(job_id, youtube_url),
-            daemon=True
-        ).start()
+        # Queue processing on the job pool
+        submit_job(download_mp3_task, job_id, youtube_url)
         
         # Prepare response with direct download URL
+        status_url = get_status_url(job_id)
         download_url = get_download_url(f"{job_id}.mp3")
         
         return jsonify({
             'job_id': job_id,
             'status': 'queued',
             'message': 'Job created successfully',
-            'check_status_url': get_status_url(job_id),
+            'check_status_url': status_url,
             'download_url': download_url
-        }), 200
+        }), 202, {'Location': status_url, 'Cache-Control': 'no-store'}
         
     except Exception as e:
         app.logger.error('Error processing MP3 download request: %s', str(e))
@@ -798,8 +993,21 @@ def direct_download():
         required: true
         description: Format to download (mp3 or mp4)
     responses:
-      200:
-        description: File download
+      202:
+        description: Job accepted; poll the URL in the Location header
+        schema:
+          type: object
+          properties:
+            job_id:
+              type: string
+            status:
+              type: string
+            message:
+              type: string
+            check_status_url:
+              type: string
+            download_url:
+              type: string
       400:
         description: Bad request
     """
@@ -809,6 +1017,8 @@ def direct_download():
         
         if format_type not in ['mp3', 'mp4']:
             return jsonify({"error": "Format must be mp3 or mp4"}), 400
+        if not YT_URL_RE.match(url):
+            return jsonify({"error": "url must be a YouTube video URL"}), 400
             
         # Generate a unique job ID
         job_id = str(uuid.uuid4())
@@ -817,21 +1027,14 @@ def direct_download():
         update_job_status(job_id, 'queued', 'Job created successfully')
         
         if format_type == 'mp3':
-            # Start MP3 download in a separate thread
-            threading.Thread(
-                target=download_mp3_task,
-                args=(job_id, url),
-                daemon=True
-            ).start()
+            # Start MP3 download on the job pool
+            submit_job(download_mp3_task, job_id, url)
         else:
-            # Start 1080p download in a separate thread
-            threading.Thread(
-                target=download_1080p_task,
-                args=(job_id, url),
-                daemon=True
-            ).start()
+            # Start 1080p download on the job pool
+            submit_job(download_1080p_task, job_id, url)
         
         # Return the direct download URL
+        status_url = get_status_url(job_id)
         if format_type == 'mp3':
             download_url = get_download_url(f"{job_id}.mp3")
         else:
@@ -841,9 +1044,9 @@ def direct_download():
             'job_id': job_id,
             'status': 'queued',
             'message': 'Job created successfully',
-            'check_status_url': get_status_url(job_id),
+            'check_status_url': status_url,
             'download_url': download_url
-        }), 200
+        }), 202, {'Location': status_url, 'Cache-Control': 'no-store'}
         
     except Exception as e:
         app.logger.error('Error processing direct download request: %s', str(e))
@@ -852,6 +1055,5 @@ def direct_download():
             'message': 'Invalid request parameters'
         }), 400
 
-# Load jobs at startup
-jobs = load_jobs()
-jobs = load_jobs()
\ No newline at end of file
+# Expire old videos in the background rather than on each request
+threading.Thread(target=cleanup_loop, daemon=True).start()